@@ -1,23 +1,30 @@
 import time
 import sys
+import random
+import functools
+import asyncio
 import json
 import tempfile
 from io import BytesIO
 import os
 import re
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 from telegram.ext import Application, CommandHandler, ContextTypes
-from telegram.error import Conflict, NetworkError
-from threading import Thread
+from telegram.error import Conflict, NetworkError, RetryAfter, TimedOut
+from threading import Thread, Lock
 import logging
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
 
 # ---------- CONFIGURAZIONE ----------
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = int(os.getenv("CHAT_ID"))
-POLL_INTERVAL = 60  # Intervallo di controllo in secondi
+POLL_INTERVAL_MIN = 15  # Minimo consentito: evita di interrogare SofaScore (e r.jina.ai) di continuo
+POLL_INTERVAL = max(POLL_INTERVAL_MIN, int(os.getenv("POLL_INTERVAL", "60")))  # Intervallo di controllo in secondi
+POLL_JITTER = 3  # Variazione casuale (± secondi) sull'attesa, per non colpire SofaScore a orari fissi
 SOFASCORE_API_URL = "https://api.sofascore.com/api/v1"
 # Proxy opzionale per SofaScore (es. Cloudflare Workers). Se settato, sostituisce la base URL.
 SOFASCORE_PROXY_BASE = os.getenv("SOFASCORE_PROXY_BASE", SOFASCORE_API_URL)
@@ -25,11 +32,77 @@ SOFASCORE_PROXY_BASE = os.getenv("SOFASCORE_PROXY_BASE", SOFASCORE_API_URL)
 
 # File per salvare le partite già notificate (evita duplicati)
 SENT_MATCHES_FILE = "sent_matches.json"
+_sent_matches = None  # Cache in memoria di sent_matches.json (caricata al primo ciclo)
+SENT_MATCHES_MAX_AGE_HOURS = 36  # Oltre questa età una partita è finita: il record non serve più
+
+# File per salvare le statistiche notifiche (sopravvivono ai riavvii)
+STATS_FILE = "stats.json"
+DAILY_NOTIFICATIONS_KEEP_DAYS = 14  # Giorni di conteggi giornalieri conservati (/stats ne mostra 7)
 
 # Tracciamento rate limiting r.jina.ai
 _jina_ai_rate_limited_until = None  # Timestamp fino a quando evitare r.jina.ai
 JINA_AI_COOLDOWN_SECONDS = 300  # 5 minuti di cooldown dopo un 429
 
+# Header per sembrare un browser reale
+SOFASCORE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.sofascore.com/",
+    "Origin": "https://www.sofascore.com"
+}
+
+# Timeout HTTP (connect, read) in secondi: connect breve per non restare bloccati su host irraggiungibili
+SOFASCORE_TIMEOUT = (3.05, 15)
+JINA_AI_TIMEOUT = (3.05, 20)
+
+# Sessione HTTP condivisa: riusa le connessioni TCP/TLS tra un poll e l'altro
+HTTP_SESSION = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    # Ritenta solo errori di connessione e 502/503/504: niente retry sui read timeout,
+    # altrimenti un endpoint bloccato costerebbe (1 + retry) x timeout di lettura
+    max_retries=Retry(
+        total=2,
+        connect=2,
+        read=False,
+        status=2,
+        backoff_factor=0.3,
+        status_forcelist=[502, 503, 504],
+        raise_on_status=False,
+    ),
+)
+HTTP_SESSION.mount("http://", _http_adapter)
+HTTP_SESSION.mount("https://", _http_adapter)
+
+# Cache delle partite live (evita di rifare le richieste a SofaScore, es. /live subito dopo un poll)
+LIVE_CACHE_TTL = 25  # secondi
+_LIVE_CACHE = {"t": 0.0, "data": []}
+_live_cache_lock = Lock()
+
+# Timeout (secondi) per il long polling degli update Telegram
+TELEGRAM_GET_UPDATES_CONNECT_TIMEOUT = 10
+TELEGRAM_GET_UPDATES_READ_TIMEOUT = 10
+
+# Numero massimo di notifiche Telegram inviate in parallelo (limite Bot API ~30 msg/s)
+NOTIFICATION_CONCURRENCY = 5
+
+# Periodo di gioco (1 = primo tempo, 2 = secondo tempo) da status code / descrizione SofaScore
+PERIOD_BY_CODE = {6: 1, 7: 2}
+PERIOD_BY_DESC = {"1st half": 1, "2nd half": 2}
+PERIOD_LABELS = {1: " (1H)", 2: " (2H)"}  # Etichette periodo usate da /live
+LIVE_LIST_LIMIT = 20  # Massimo partite elencate da /live
+
+# Regex precompilate
+NEW_CHAT_ID_RE = re.compile(r'New chat id: (-?\d+)')  # Migrazione gruppo -> supergruppo
+MINUTE_RE = re.compile(r'(\d+)\s*[\'"]')  # Minuto nella descrizione (es. "1st half 23'")
+
+# Tag periodo cercati nella descrizione status (minuscolo), nell'ordine di controllo
+PERIOD_TAGS = ("1st half", "2nd half", "halftime", "break")
+# Tag periodo che indicano l'intervallo
+HALFTIME_TAGS = frozenset({"halftime", "break"})
+
 
 
 
@@ -37,22 +110,110 @@ JINA_AI_COOLDOWN_SECONDS = 300  # 5 minuti di cooldown dopo un 429
 # ---------- FUNZIONI UTILI ----------
 
 def load_sent_matches():
-    """Carica le partite già notificate da file"""
+    """Carica le partite già notificate da file (scartando quelle troppo vecchie)"""
     try:
         with open(SENT_MATCHES_FILE, "r") as f:
             data = json.load(f)
-            # Se è una lista (vecchio formato), converti in dict
-            if isinstance(data, list):
-                return {match_id: {} for match_id in data}
-            return data
     except Exception:
         return {}
+    # Se è una lista (vecchio formato), converti in dict: senza notified_at verranno scartate
+    if isinstance(data, list):
+        data = {match_id: {} for match_id in data}
+    if not isinstance(data, dict):
+        return {}
+    if prune_sent_matches(data):
+        try:
+            save_sent_matches(data)
+        except Exception as e:
+            print(f"[{_now_utc()}] ⚠️ Errore salvataggio partite notificate: {e}")
+            sys.stdout.flush()
+    return data
+
+
+def _parse_iso(value):
+    """Converte un timestamp ISO in datetime (datetime.min se mancante o non valido)"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime.min
+
+
+def prune_sent_matches(sent_dict):
+    """Rimuove le partite notificate da più di SENT_MATCHES_MAX_AGE_HOURS ore. Ritorna quante ne ha rimosse."""
+    cutoff = datetime.now() - timedelta(hours=SENT_MATCHES_MAX_AGE_HOURS)
+    stale = [
+        match_id for match_id, record in sent_dict.items()
+        if not isinstance(record, dict) or _parse_iso(record.get("notified_at")) < cutoff
+    ]
+    for match_id in stale:
+        del sent_dict[match_id]
+    return len(stale)
 
 
 def save_sent_matches(sent_dict):
-    """Salva le partite già notificate su file"""
-    with open(SENT_MATCHES_FILE, "w") as f:
-        json.dump(sent_dict, f, indent=2)
+    """Salva le partite già notificate su file (scrittura atomica tramite file temporaneo)"""
+    tmp_file = SENT_MATCHES_FILE + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(sent_dict, f, separators=(",", ":"))
+    os.replace(tmp_file, SENT_MATCHES_FILE)
+
+
+def load_stats():
+    """Carica le statistiche notifiche (totale e conteggi giornalieri) da file"""
+    global total_notifications_sent
+    try:
+        with open(STATS_FILE, "r") as f:
+            data = json.load(f)
+        total_notifications_sent = int(data.get("total", 0))
+        daily_notifications.update(data.get("daily", {}))
+        _prune_daily_notifications()
+    except Exception:
+        pass
+
+
+def save_stats():
+    """Salva le statistiche notifiche su file (scrittura atomica tramite file temporaneo)"""
+    tmp_file = STATS_FILE + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump({"total": total_notifications_sent, "daily": daily_notifications}, f, separators=(",", ":"))
+    os.replace(tmp_file, STATS_FILE)
+
+
+def _prune_daily_notifications():
+    """Mantiene solo gli ultimi DAILY_NOTIFICATIONS_KEEP_DAYS giorni di conteggi"""
+    if len(daily_notifications) > DAILY_NOTIFICATIONS_KEEP_DAYS:
+        for day in sorted(daily_notifications)[:-DAILY_NOTIFICATIONS_KEEP_DAYS]:
+            del daily_notifications[day]
+
+
+def _record_notification():
+    """Aggiorna le statistiche dopo una notifica inviata"""
+    global total_notifications_sent
+    total_notifications_sent += 1
+    daily_notifications[_today_str()] += 1
+    _prune_daily_notifications()
+
+
+@functools.lru_cache(maxsize=2)
+def _utc_iso(epoch_second):
+    """Timestamp UTC ISO (precisione al secondo) per i log"""
+    return datetime.utcfromtimestamp(epoch_second).isoformat() + "Z"
+
+
+def _now_utc():
+    """Timestamp UTC ISO per i log (calcolato solo quando serve, riusato nello stesso secondo)"""
+    return _utc_iso(int(time.time()))
+
+
+@functools.lru_cache(maxsize=16)
+def _day_str(day_epoch):
+    """Chiave giorno "YYYY-MM-DD" (UTC) per day_epoch = giorni dal 1970-01-01"""
+    return (datetime(1970, 1, 1) + timedelta(days=day_epoch)).strftime("%Y-%m-%d")
+
+
+def _today_str():
+    """Chiave del giorno corrente (UTC) per le statistiche notifiche"""
+    return _day_str(int(time.time()) // 86400)
 
 
 def get_match_id(home, away, league, event_id=None):
@@ -65,44 +226,43 @@ def get_match_id(home, away, league, event_id=None):
 def _fetch_sofascore_json(url, headers):
     """Tenta fetch diretto; su 403 usa fallback r.jina.ai come proxy pubblico."""
     global _jina_ai_rate_limited_until
-    now_utc = datetime.utcnow().isoformat() + "Z"
     try:
-        resp = requests.get(url, headers=headers, timeout=15)
+        resp = HTTP_SESSION.get(url, headers=headers, timeout=SOFASCORE_TIMEOUT)
         if resp.status_code == 200:
             try:
                 return resp.json()
             except Exception:
-                print(f"[{now_utc}] ⚠️ JSON non valido dalla API diretta, lunghezza body={len(resp.text)}")
+                print(f"[{_now_utc()}] ⚠️ JSON non valido dalla API diretta, lunghezza body={len(resp.text)}")
                 sys.stdout.flush()
                 return None
         if resp.status_code != 403:
-            print(f"[{now_utc}] ⚠️ Errore API SofaScore: status={resp.status_code}")
+            print(f"[{_now_utc()}] ⚠️ Errore API SofaScore: status={resp.status_code}")
             sys.stdout.flush()
             return None
         # Controlla se siamo in cooldown per r.jina.ai
         if _jina_ai_rate_limited_until and datetime.now() < _jina_ai_rate_limited_until:
             remaining = (_jina_ai_rate_limited_until - datetime.now()).total_seconds()
-            print(f"[{now_utc}] ⏸️ r.jina.ai in cooldown per altri {int(remaining)} secondi (rate limit)")
+            print(f"[{_now_utc()}] ⏸️ r.jina.ai in cooldown per altri {int(remaining)} secondi (rate limit)")
             sys.stdout.flush()
             return None
         # Fallback via r.jina.ai (no crediti, spesso evita blocchi IP)
         # Convertiamo https://... in http://... per l'URL interno
         inner = url.replace("https://", "http://")
         proxy_url = f"https://r.jina.ai/{inner}"
-        print(f"[{now_utc}] 🔁 Fallback via r.jina.ai: {proxy_url}")
+        print(f"[{_now_utc()}] 🔁 Fallback via r.jina.ai: {proxy_url}")
         sys.stdout.flush()
-        prox_resp = requests.get(
+        prox_resp = HTTP_SESSION.get(
             proxy_url,
             headers={
                 "User-Agent": headers.get("User-Agent", "Mozilla/5.0"),
                 "Accept": "application/json",
             },
-            timeout=20,
+            timeout=JINA_AI_TIMEOUT,
         )
         if prox_resp.status_code == 200:
             try:
-                import json as _json
-                wrapper = prox_resp.json()
+                # json.loads accetta direttamente i bytes (evita la decodifica in str)
+                wrapper = json.loads(prox_resp.content)
                 # r.jina.ai restituisce un wrapper con data.content come stringa JSON
                 if isinstance(wrapper, dict) and "data" in wrapper:
                     data_obj = wrapper.get("data", {})
@@ -111,48 +271,177 @@ def _fetch_sofascore_json(url, headers):
                         if isinstance(content_str, str) and content_str.strip().startswith("{"):
                             # Parse il JSON annidato
                             try:
-                                return _json.loads(content_str)
+                                return json.loads(content_str)
                             except Exception as e:
-                                print(f"[{now_utc}] ⚠️ Errore parse JSON annidato da r.jina.ai: {e}")
+                                print(f"[{_now_utc()}] ⚠️ Errore parse JSON annidato da r.jina.ai: {e}")
                                 sys.stdout.flush()
                 # Se non è il formato r.jina.ai, restituisci direttamente
                 return wrapper
             except Exception:
                 # Alcuni proxy restituiscono testo JSON valido: prova json.loads
-                import json as _json
                 try:
-                    return _json.loads(prox_resp.text)
+                    return json.loads(prox_resp.text)
                 except Exception:
-                    print(f"[{now_utc}] ⚠️ Impossibile parsare JSON dal fallback, primi 200 char: {prox_resp.text[:200]!r}")
+                    print(f"[{_now_utc()}] ⚠️ Impossibile parsare JSON dal fallback, primi 200 char: {prox_resp.text[:200]!r}")
                     sys.stdout.flush()
                     return None
         # Gestisci rate limiting (429)
         if prox_resp.status_code == 429:
             _jina_ai_rate_limited_until = datetime.now() + timedelta(seconds=JINA_AI_COOLDOWN_SECONDS)
-            print(f"[{now_utc}] ⚠️ Fallback r.jina.ai fallito: status=429 (rate limit). Cooldown per {JINA_AI_COOLDOWN_SECONDS} secondi")
+            print(f"[{_now_utc()}] ⚠️ Fallback r.jina.ai fallito: status=429 (rate limit). Cooldown per {JINA_AI_COOLDOWN_SECONDS} secondi")
             sys.stdout.flush()
         else:
-            print(f"[{now_utc}] ⚠️ Fallback r.jina.ai fallito: status={prox_resp.status_code}")
+            print(f"[{_now_utc()}] ⚠️ Fallback r.jina.ai fallito: status={prox_resp.status_code}")
             sys.stdout.flush()
         return None
     except Exception as e:
-        print(f"[{now_utc}] ⚠️ Eccezione fetch SofaScore: {e}")
+        print(f"[{_now_utc()}] ⚠️ Eccezione fetch SofaScore: {e}")
         sys.stdout.flush()
         return None
 
 
-def scrape_sofascore():
-    """Ottiene tutte le partite live tramite API SofaScore"""
+def _intern(value):
+    """Interna le stringhe ripetute tra eventi (lega, paese, stato) per condividerne un'unica copia"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _period_tag(status_desc):
+    """Primo tag di PERIOD_TAGS contenuto nella descrizione status (già in minuscolo), "" se nessuno"""
+    for tag in PERIOD_TAGS:
+        if tag in status_desc:
+            return tag
+    return ""
+
+
+def _extract_match(event, now_ts):
+    """Estrae i campi utili da un evento SofaScore. Ritorna None se l'evento ha un formato inatteso."""
     try:
-        # Header per sembrare un browser reale
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "application/json",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "https://www.sofascore.com/",
-            "Origin": "https://www.sofascore.com"
-        }
+        # Estrai informazioni partita
+        tournament = event.get("tournament", {})
+        league = tournament.get("name", "Unknown")
+        country = tournament.get("category", {}).get("name", "Unknown")
         
+        home_team = event.get("homeTeam", {})
+        away_team = event.get("awayTeam", {})
+        home = home_team.get("name", "Unknown")
+        away = away_team.get("name", "Unknown")
+        
+        # Estrai punteggio (sono oggetti con 'current' o 'display')
+        score_home_obj = event.get("homeScore", {})
+        score_away_obj = event.get("awayScore", {})
+        
+        # Estrai valore numerico dal punteggio
+        if isinstance(score_home_obj, dict):
+            score_home = score_home_obj.get("current", score_home_obj.get("display", 0))
+        else:
+            score_home = score_home_obj if score_home_obj is not None else 0
+        
+        if isinstance(score_away_obj, dict):
+            score_away = score_away_obj.get("current", score_away_obj.get("display", 0))
+        else:
+            score_away = score_away_obj if score_away_obj is not None else 0
+        
+        # Estrai stato partita e determina il periodo una sola volta:
+        # prima tramite status code (tabella), poi tramite descrizione
+        status = event.get("status", {})
+        status_code = status.get("code")
+        status_desc = status.get("description", "").lower()
+        # Tag periodo dalla descrizione calcolato solo se serve (None = non calcolato):
+        # con status code 6/7 (la maggior parte degli eventi live) la descrizione non viene scansionata
+        period_tag = None
+        status_period = PERIOD_BY_CODE.get(status_code)
+        if status_period is None:
+            period_tag = _period_tag(status_desc)
+            status_period = PERIOD_BY_DESC.get(period_tag)
+        is_first_half = status_period == 1
+        is_second_half = status_period == 2
+        
+        # Estrai minuto e calcola attendibilità
+        time_obj = event.get("time", {})
+        minute = None
+        reliability = 0  # Attendibilità 0-5
+        
+        if isinstance(time_obj, dict):
+            # Calcola minuto corrente basato su currentPeriodStartTimestamp
+            if "currentPeriodStartTimestamp" in time_obj:
+                start_ts = time_obj.get("currentPeriodStartTimestamp")
+                if start_ts:
+                    elapsed_seconds = now_ts - start_ts
+                    elapsed_minutes = int(elapsed_seconds / 60)
+                    
+                    if is_second_half:
+                        # Secondo tempo: aggiungi 45 minuti
+                        minute = 45 + max(0, elapsed_minutes)
+                        reliability = 4  # Calcolo corretto con periodo
+                    elif is_first_half:
+                        # Primo tempo: minuto diretto
+                        minute = max(0, elapsed_minutes)
+                        reliability = 4  # Calcolo corretto con periodo
+                    else:
+                        # Periodo non determinato, usa solo elapsed
+                        minute = max(0, elapsed_minutes)
+                        reliability = 2  # Minuto calcolato ma senza periodo
+            
+            # Se non disponibile, prova a estrarre da status description
+            if minute is None:
+                if period_tag is None:
+                    period_tag = _period_tag(status_desc)
+                if period_tag in PERIOD_BY_DESC:
+                    # Estrai numero se presente nella descrizione (es. "1st half 23'")
+                    # Filtro economico: la regex può trovare qualcosa solo se c'è un apice/virgoletta
+                    match = MINUTE_RE.search(status_desc) if ("'" in status_desc or '"' in status_desc) else None
+                    if match:
+                        extracted_min = int(match.group(1))
+                        if is_second_half and extracted_min < 45:
+                            # Se è secondo tempo ma il minuto è < 45, aggiungi 45
+                            minute = 45 + extracted_min
+                        else:
+                            minute = extracted_min
+                        reliability = 3  # Minuto estratto da descrizione
+        elif isinstance(time_obj, (int, float)):
+            minute = int(time_obj)
+            reliability = 1  # Minuto diretto ma senza contesto
+        
+        # Determina metà tempo (1 = primo tempo, 2 = secondo tempo)
+        period = status_period
+        if period is None and minute is not None:
+            # Determina dalla base del minuto
+            period = 1 if minute <= 45 else 2
+        
+        # Estrai ID partita per recuperare eventi/gol
+        event_id = event.get("id")
+        
+        # Il tag serve al controllo intervallo solo per le partite 0-0
+        is_zero_zero = score_home == 0 and score_away == 0
+        if period_tag is None and is_zero_zero:
+            period_tag = _period_tag(status_desc)
+        
+        return {
+            "home": home,
+            "away": away,
+            "score_home": score_home,
+            "score_away": score_away,
+            "is_zero_zero": is_zero_zero,
+            "league": _intern(league),
+            "country": _intern(country),
+            "minute": minute,
+            "period": period,  # 1 = primo tempo, 2 = secondo tempo
+            "reliability": reliability,  # Attendibilità 0-5
+            "event_id": event_id,  # ID partita per recuperare eventi/gol
+            "match_id": get_match_id(home, away, league, event_id),  # Chiave in sent_matches
+            "status_code": status_code,
+            "status_type": _intern(status.get("type")),
+            "status_description": _intern(status.get("description", "")),
+            "period_tag": period_tag,  # Tag periodo dalla descrizione (vedi PERIOD_TAGS), None se non calcolato
+        }
+    except (TypeError, AttributeError, KeyError) as e:
+        print(f"Errore nell'estrazione partita: {e}")
+        return None
+
+
+def _scrape_sofascore_uncached():
+    """Ottiene tutte le partite live tramite API SofaScore"""
+    try:
         # Prova multipli endpoint per recuperare eventi live
         endpoints = [
             f"{SOFASCORE_PROXY_BASE}/sport/football/events/live",
@@ -160,12 +449,12 @@ def scrape_sofascore():
             f"{SOFASCORE_PROXY_BASE}/sport/football/livescore",
         ]
         
-        now_utc = datetime.utcnow().isoformat() + "Z"
+        now_utc = _now_utc()
         events = []
         for idx, url in enumerate(endpoints, start=1):
             print(f"[{now_utc}] Richiesta API SofaScore: {url}... (tentativo {idx})")
             sys.stdout.flush()
-            data = _fetch_sofascore_json(url, headers)
+            data = _fetch_sofascore_json(url, SOFASCORE_HEADERS)
             if not data:
                 continue
             # Normalizza le possibili chiavi
@@ -175,155 +464,64 @@ def scrape_sofascore():
             if events:
                 break
             else:
-                # Log breve del payload per capire il formato
-                try:
-                    import json as _json
-                    raw = _json.dumps(data)[:200]
-                except Exception:
-                    raw = str(data)[:200]
-                print(f"[{now_utc}] ℹ️ Nessun evento nell'endpoint, anteprima payload: {raw}")
+                # Log breve del payload per capire il formato: solo le chiavi di primo livello,
+                # senza riserializzare tutto il payload per tenerne 200 caratteri
+                raw = ", ".join(str(key) for key in data)[:200]
+                print(f"[{now_utc}] ℹ️ Nessun evento nell'endpoint, chiavi payload: {raw}")
                 sys.stdout.flush()
         
+        # Rilascia il payload completo: serve solo la lista degli eventi
+        data = None
+        
         matches = []
         if not events:
             print(f"[{now_utc}] ⚠️ Nessun evento trovato su tutti gli endpoint live")
             sys.stdout.flush()
             return []
         
-        for event in events:
-            try:
-                # Estrai informazioni partita
-                tournament = event.get("tournament", {})
-                league = tournament.get("name", "Unknown")
-                country = tournament.get("category", {}).get("name", "Unknown")
-                
-                home_team = event.get("homeTeam", {})
-                away_team = event.get("awayTeam", {})
-                home = home_team.get("name", "Unknown")
-                away = away_team.get("name", "Unknown")
-                
-                # Estrai punteggio (sono oggetti con 'current' o 'display')
-                score_home_obj = event.get("homeScore", {})
-                score_away_obj = event.get("awayScore", {})
-                
-                # Estrai valore numerico dal punteggio
-                if isinstance(score_home_obj, dict):
-                    score_home = score_home_obj.get("current", score_home_obj.get("display", 0))
-                else:
-                    score_home = score_home_obj if score_home_obj is not None else 0
-                
-                if isinstance(score_away_obj, dict):
-                    score_away = score_away_obj.get("current", score_away_obj.get("display", 0))
-                else:
-                    score_away = score_away_obj if score_away_obj is not None else 0
-                
-                # Estrai minuto e calcola attendibilità
-                time_obj = event.get("time", {})
-                status = event.get("status", {})
-                minute = None
-                reliability = 0  # Attendibilità 0-5
-                
-                if isinstance(time_obj, dict):
-                    # Determina periodo (1st half o 2nd half)
-                    status_desc = status.get("description", "").lower()
-                    status_code = status.get("code")
-                    is_first_half = "1st half" in status_desc or status_code == 6
-                    is_second_half = "2nd half" in status_desc or status_code == 7
-                    
-                    # Calcola minuto corrente basato su currentPeriodStartTimestamp
-                    if "currentPeriodStartTimestamp" in time_obj:
-                        start_ts = time_obj.get("currentPeriodStartTimestamp")
-                        if start_ts:
-                            elapsed_seconds = datetime.now().timestamp() - start_ts
-                            elapsed_minutes = int(elapsed_seconds / 60)
-                            
-                            if is_second_half:
-                                # Secondo tempo: aggiungi 45 minuti
-                                minute = 45 + max(0, elapsed_minutes)
-                                reliability = 4  # Calcolo corretto con periodo
-                            elif is_first_half:
-                                # Primo tempo: minuto diretto
-                                minute = max(0, elapsed_minutes)
-                                reliability = 4  # Calcolo corretto con periodo
-                            else:
-                                # Periodo non determinato, usa solo elapsed
-                                minute = max(0, elapsed_minutes)
-                                reliability = 2  # Minuto calcolato ma senza periodo
-                    
-                    # Se non disponibile, prova a estrarre da status description
-                    if minute is None:
-                        desc = status.get("description", "")
-                        if "1st half" in desc or "2nd half" in desc:
-                            # Estrai numero se presente nella descrizione (es. "1st half 23'")
-                            match = re.search(r'(\d+)\s*[\'"]', desc)
-                            if match:
-                                extracted_min = int(match.group(1))
-                                if is_second_half and extracted_min < 45:
-                                    # Se è secondo tempo ma il minuto è < 45, aggiungi 45
-                                    minute = 45 + extracted_min
-                                else:
-                                    minute = extracted_min
-                                reliability = 3  # Minuto estratto da descrizione
-                elif isinstance(time_obj, (int, float)):
-                    minute = int(time_obj)
-                    reliability = 1  # Minuto diretto ma senza contesto
-                
-                # Estrai stato partita
-                status = event.get("status", {})
-                status_type = status.get("type", "")
-                
-                # Determina metà tempo (1st half o 2nd half)
-                period = None
-                status_desc = status.get("description", "").lower()
-                if "1st half" in status_desc or status.get("code") == 6:
-                    period = 1  # Primo tempo
-                elif "2nd half" in status_desc or status.get("code") == 7:
-                    period = 2  # Secondo tempo
-                elif minute is not None:
-                    # Determina dalla base del minuto
-                    if minute <= 45:
-                        period = 1
-                    else:
-                        period = 2
-                
-                # Estrai ID partita per recuperare eventi/gol
-                event_id = event.get("id")
-                
-                matches.append({
-                    "home": home,
-                    "away": away,
-                    "score_home": score_home,
-                    "score_away": score_away,
-                    "league": league,
-                    "country": country,
-                    "minute": minute,
-                    "period": period,  # 1 = primo tempo, 2 = secondo tempo
-                    "reliability": reliability,  # Attendibilità 0-5
-                    "event_id": event_id,  # ID partita per recuperare eventi/gol
-                    "status_code": status.get("code"),
-                    "status_type": status.get("type"),
-                    "status_description": status.get("description", "")
-                })
-            except Exception as e:
-                print(f"Errore nell'estrazione partita: {e}")
-                continue
+        # Timestamp corrente calcolato una sola volta per tutto il batch di eventi
+        now_ts = time.time()
+        # Consuma gli eventi uno alla volta (in ordine originale) così ogni dict
+        # grezzo viene liberato appena estratto, invece di tenere in memoria
+        # insieme l'intero albero JSON e la lista delle partite
+        events.reverse()
+        while events:
+            match = _extract_match(events.pop(), now_ts)
+            if match is not None:
+                matches.append(match)
         
         print(f"[{now_utc}] ✅ Estratte {len(matches)} partite totali dalla risposta")
         sys.stdout.flush()
         return matches
     
     except requests.exceptions.RequestException as e:
-        now_utc = datetime.utcnow().isoformat() + "Z"
+        now_utc = _now_utc()
         print(f"[{now_utc}] Errore nella richiesta API SofaScore: {e}")
         sys.stdout.flush()
         return []
     except Exception as e:
-        now_utc = datetime.utcnow().isoformat() + "Z"
+        now_utc = _now_utc()
         print(f"[{now_utc}] Errore nello scraping SofaScore: {e}")
         sys.stdout.flush()
         return []
 
 
+def scrape_sofascore(force=False):
+    """
+    Partite live con cache TTL condivisa tra /live e il ciclo di controllo.
+    
+    /live legge dalla cache; il ciclo di controllo passa force=True per rifare sempre
+    la richiesta e aggiornare lo snapshot (così nessun poll riusa dati vecchi).
+    """
+    with _live_cache_lock:
+        if not force and _LIVE_CACHE["t"] and time.monotonic() - _LIVE_CACHE["t"] < LIVE_CACHE_TTL:
+            return _LIVE_CACHE["data"]
+        data = _scrape_sofascore_uncached()
+        _LIVE_CACHE["t"] = time.monotonic()
+        _LIVE_CACHE["data"] = data
+        return data
+
+
 def is_match_0_0_first_half(match):
     """
     Verifica se una partita è 0-0 a fine primo tempo durante l'intervallo.
@@ -332,20 +530,17 @@ def is_match_0_0_first_half(match):
     - Punteggio è 0-0
     - Status code 31 (halftime/intervallo) O periodo = 2 con minuto <= 50 (per confermare che il primo tempo era 0-0)
     """
-    score_home = match.get("score_home", 0)
-    score_away = match.get("score_away", 0)
-    
-    # Deve essere 0-0
-    if score_home != 0 or score_away != 0:
+    # Deve essere 0-0 (flag calcolato una volta in fase di estrazione)
+    if not match.get("is_zero_zero"):
         return False
     
     minute = match.get("minute")
     period = match.get("period")
     status_code = match.get("status_code")
-    status_desc = match.get("status_description", "").lower()
     
     # Verifica che la partita sia in intervallo (status code 31 = halftime)
-    if status_code == 31 or "halftime" in status_desc or "break" in status_desc:
+    # period_tag è calcolato una volta in fase di estrazione: niente scansioni della descrizione
+    if status_code == 31 or match.get("period_tag") in HALFTIME_TAGS:
         return True
     
     # Fallback: Se periodo = 2 e minuto <= 50, significa che il primo tempo è appena finito
@@ -390,31 +585,49 @@ def format_match_notification(match):
     return message
 
 
+def _should_retry_send(error):
+    """
+    True solo se l'invio è sicuramente fallito e ha senso ritentarlo al prossimo ciclo.
+    
+    - RetryAfter (flood control): il messaggio non è stato inviato
+    - TimedOut: il messaggio potrebbe essere già arrivato, non ritentare (evita doppioni)
+    - Altri NetworkError (connessione non riuscita): il messaggio non è partito
+    - Altri errori (Forbidden, BadRequest, ...): permanenti, non ritentare
+    """
+    if isinstance(error, RetryAfter):
+        return True
+    if isinstance(error, TimedOut):
+        return False
+    return isinstance(error, NetworkError)
+
+
 async def send_notification(match, application):
-    """Invia notifica Telegram per partita 0-0 a fine primo tempo"""
-    global total_notifications_sent, CHAT_ID
+    """
+    Invia notifica Telegram per partita 0-0 a fine primo tempo.
+    Ritorna False solo se l'invio va ritentato al prossimo ciclo (vedi _should_retry_send),
+    True se consegnata o se un nuovo tentativo non va fatto (timeout o errore permanente).
+    """
+    global CHAT_ID
     
     try:
         message = format_match_notification(match)
         await application.bot.send_message(chat_id=CHAT_ID, text=message)
         
         # Aggiorna statistiche
-        total_notifications_sent += 1
-        today = datetime.now().strftime("%Y-%m-%d")
-        daily_notifications[today] += 1
+        _record_notification()
         
-        now_utc = datetime.utcnow().isoformat() + "Z"
+        now_utc = _now_utc()
         print(f"[{now_utc}] ✅ Notifica inviata: {match.get('home')} - {match.get('away')} (0-0 HT)")
         sys.stdout.flush()
+        return True
     except Exception as e:
         error_msg = str(e)
-        now_utc = datetime.utcnow().isoformat() + "Z"
+        now_utc = _now_utc()
         
         # Gestisci migrazione gruppo a supergruppo
         if "Group migrated to supergroup" in error_msg:
             # Estrai il nuovo chat_id dal messaggio di errore
-            import re
-            match_result = re.search(r'New chat id: (-?\d+)', error_msg)
+            match_result = NEW_CHAT_ID_RE.search(error_msg)
             if match_result:
                 new_chat_id = int(match_result.group(1))
                 print(f"[{now_utc}] 🔄 Gruppo migrato a supergruppo. Aggiorno CHAT_ID da {CHAT_ID} a {new_chat_id}")
@@ -423,88 +636,103 @@ async def send_notification(match, application):
                 # Prova a reinviare con il nuovo chat_id
                 try:
                     await application.bot.send_message(chat_id=CHAT_ID, text=message)
-                    total_notifications_sent += 1
-                    today = datetime.now().strftime("%Y-%m-%d")
-                    daily_notifications[today] += 1
+                    _record_notification()
                     print(f"[{now_utc}] ✅ Notifica inviata con nuovo chat_id: {match.get('home')} - {match.get('away')} (0-0 HT)")
                     sys.stdout.flush()
-                    return
+                    return True
                 except Exception as retry_e:
                     print(f"[{now_utc}] ⚠️ Errore reinvio notifica dopo migrazione: {retry_e}")
                     sys.stdout.flush()
+                    return not _should_retry_send(retry_e)
         
-        print(f"[{now_utc}] ⚠️ Errore invio notifica: {error_msg}")
+        retry = _should_retry_send(e)
+        print(f"[{now_utc}] ⚠️ Errore invio notifica ({'ritento al prossimo ciclo' if retry else 'nessun nuovo tentativo'}): {error_msg}")
         sys.stdout.flush()
+        return not retry
+
+
+async def send_notifications(matches, application):
+    """Invia in parallelo le notifiche di un ciclo, con concorrenza limitata.
+    Ritorna una lista di bool (gestita o da ritentare) nello stesso ordine di matches."""
+    semaphore = asyncio.Semaphore(NOTIFICATION_CONCURRENCY)
+
+    async def _send_with_limit(match):
+        async with semaphore:
+            return await send_notification(match, application)
+
+    return await asyncio.gather(*(_send_with_limit(match) for match in matches))
 
 
 # ---------- LOGICA PRINCIPALE ----------
 
-def process_matches(application):
+async def process_matches_async(application):
     """Processa tutte le partite live e invia notifiche per 0-0 a fine primo tempo"""
-    import asyncio
-    sent_matches = load_sent_matches()
+    global _sent_matches
+    # Stato caricato da file una sola volta, poi mantenuto in memoria tra i cicli
+    # (I/O su file in un thread: il loop serve anche gli update Telegram)
+    if _sent_matches is None:
+        _sent_matches = await asyncio.to_thread(load_sent_matches)
+    sent_matches = _sent_matches
     
     # Scraping partite live
     print("Scraping SofaScore...")
-    live_matches = scrape_sofascore()
+    # scrape_sofascore usa requests (bloccante): eseguilo in un thread per non fermare il loop
+    # force=True: il poll ignora la cache TTL (usata solo da /live) e aggiorna lo snapshot
+    live_matches = await asyncio.to_thread(scrape_sofascore, force=True)
     print(f"Trovate {len(live_matches)} partite live")
     
     now = datetime.now()
-    
-    for match in live_matches:
+
+    # Unico passaggio: seleziona solo le partite non ancora notificate e 0-0 a fine primo tempo
+    # (match_id già calcolato in fase di estrazione)
+    candidates = [
+        (m["match_id"], m)
+        for m in live_matches
+        if m["is_zero_zero"] and m["match_id"] not in sent_matches and is_match_0_0_first_half(m)
+    ]
+
+    if not candidates:
+        return
+
+    # Invia tutte le notifiche del ciclo in parallelo usando application.bot
+    try:
+        handled = await send_notifications([match for _, match in candidates], application)
+    except Exception as e:
+        now_utc = _now_utc()
+        print(f"[{now_utc}] ⚠️ Errore invio notifica async: {e}")
+        sys.stdout.flush()
+        handled = [False] * len(candidates)
+
+    # Segna come notificate le partite consegnate (o con timeout/errore permanente):
+    # solo gli invii sicuramente falliti vengono ritentati al prossimo ciclo (se ancora 0-0 all'intervallo)
+    notified = [candidate for candidate, ok in zip(candidates, handled) if ok]
+    if not notified:
+        return
+
+    for match_id, match in notified:
         home = match["home"]
         away = match["away"]
         league = match["league"]
         event_id = match.get("event_id")
-        
-        # Usa event_id come match_id se disponibile, altrimenti genera uno
-        match_id = get_match_id(home, away, league, event_id)
-        
-        # Se la partita è già stata notificata, salta
-        if match_id in sent_matches:
-            continue
-        
-        # Verifica se è 0-0 a fine primo tempo
-        if is_match_0_0_first_half(match):
-            # Invia notifica (async) usando application.bot
-            try:
-                # Ottieni il loop dell'application
-                try:
-                    loop = asyncio.get_event_loop()
-                except RuntimeError:
-                    # Se non c'è loop, prova a ottenerlo dall'application
-                    if hasattr(application, '_updater') and hasattr(application._updater, '_loop'):
-                        loop = application._updater._loop
-                    else:
-                        # Crea un nuovo loop
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                
-                # Usa run_coroutine_threadsafe se il loop è in esecuzione
-                if loop.is_running():
-                    asyncio.run_coroutine_threadsafe(send_notification(match, application), loop)
-                else:
-                    # Altrimenti esegui direttamente
-                    loop.run_until_complete(send_notification(match, application))
-            except Exception as e:
-                now_utc = datetime.utcnow().isoformat() + "Z"
-                print(f"[{now_utc}] ⚠️ Errore invio notifica async: {e}")
-                sys.stdout.flush()
-            
-            # Salva come notificata
-            sent_matches[match_id] = {
-                "home": home,
-                "away": away,
-                "league": league,
-                "country": match.get("country", "Unknown"),
-                "event_id": event_id,
-                "minute": match.get("minute"),
-                "period": match.get("period"),
-                "notified_at": now.isoformat()
-            }
-    
-    # Salva stato
-    save_sent_matches(sent_matches)
+
+        # Salva come notificata
+        sent_matches[match_id] = {
+            "home": home,
+            "away": away,
+            "league": league,
+            "country": match.get("country", "Unknown"),
+            "event_id": event_id,
+            "minute": match.get("minute"),
+            "period": match.get("period"),
+            "notified_at": now.isoformat()
+        }
+
+    # Salva stato e statistiche (solo se ci sono nuove partite notificate in questo ciclo).
+    # Scritture su file in un thread per non bloccare il loop; i cicli non si sovrappongono
+    # e i comandi non modificano questi dati, quindi non servono lock
+    prune_sent_matches(sent_matches)
+    await asyncio.to_thread(save_sent_matches, sent_matches)
+    await asyncio.to_thread(save_stats)
 
 
 # ---------- STATO RUNTIME PER COMANDI ----------
@@ -517,6 +745,23 @@ last_check_error = None
 total_notifications_sent = 0
 daily_notifications = defaultdict(int)
 
+# Ultimo timestamp di log per ciascun errore (evita spam di errori identici)
+_recent_errors = {}
+ERROR_LOG_DEDUP_SECONDS = 60
+
+
+def _should_log_error(error):
+    """True se l'errore non è già stato loggato negli ultimi ERROR_LOG_DEDUP_SECONDS secondi"""
+    now = time.monotonic()
+    # Rimuovi le voci scadute
+    for key in [k for k, ts in _recent_errors.items() if now - ts >= ERROR_LOG_DEDUP_SECONDS]:
+        del _recent_errors[key]
+    key = f"{type(error).__name__}:{str(error)[:80]}"
+    if key in _recent_errors:
+        return False
+    _recent_errors[key] = now
+    return True
+
 
 # ---------- COMANDI TELEGRAM ----------
 
@@ -558,111 +803,130 @@ async def cmd_help(update, context):
 
 async def cmd_status(update, context):
     """Mostra stato del bot"""
-    lines = []
-    lines.append("📊 Stato Bot:")
-    lines.append(f"Intervallo controlli: {POLL_INTERVAL} secondi ({POLL_INTERVAL // 60} minuto{'i' if POLL_INTERVAL // 60 > 1 else ''})")
-    
-    if last_check_started_at:
-        lines.append(f"Ultimo check start: {last_check_started_at.strftime('%H:%M:%S')}")
-    else:
-        lines.append("Ultimo check start: Nessuno")
-    
-    if last_check_finished_at:
-        lines.append(f"Ultimo check end: {last_check_finished_at.strftime('%H:%M:%S')}")
-        if last_check_started_at:
-            elapsed = (last_check_finished_at - last_check_started_at).total_seconds()
-            lines.append(f"Durata ultimo check: {elapsed:.1f}s")
-    else:
-        lines.append("Ultimo check end: Nessuno")
-    
-    if last_check_error:
-        lines.append(f"⚠️ Ultimo errore: {last_check_error}")
-    else:
-        lines.append("✅ Nessun errore")
+    # POLL_INTERVAL è configurabile: mostra i minuti solo se l'intervallo è almeno di un minuto
+    poll_minutes = POLL_INTERVAL // 60
+    minutes_str = f" ({poll_minutes} minuto{'i' if poll_minutes > 1 else ''})" if poll_minutes else ""
+    
+    started_str = last_check_started_at.strftime('%H:%M:%S') if last_check_started_at else "Nessuno"
+    finished_str = last_check_finished_at.strftime('%H:%M:%S') if last_check_finished_at else "Nessuno"
+    duration_str = ""
+    if last_check_finished_at and last_check_started_at:
+        elapsed = (last_check_finished_at - last_check_started_at).total_seconds()
+        duration_str = f"\nDurata ultimo check: {elapsed:.1f}s"
+    error_str = f"⚠️ Ultimo errore: {last_check_error}" if last_check_error else "✅ Nessun errore"
     
     # Statistiche giornaliere
-    today = datetime.now().strftime("%Y-%m-%d")
-    lines.append(f"Notifiche oggi: {daily_notifications.get(today, 0)}")
-    lines.append(f"Totale notifiche: {total_notifications_sent}")
+    today = _today_str()
     
-    await update.message.reply_text("\n".join(lines))
+    await update.message.reply_text(
+        "📊 Stato Bot:\n"
+        f"Intervallo controlli: {POLL_INTERVAL} secondi{minutes_str}\n"
+        f"Ultimo check start: {started_str}\n"
+        f"Ultimo check end: {finished_str}{duration_str}\n"
+        f"{error_str}\n"
+        f"Notifiche oggi: {daily_notifications.get(today, 0)}\n"
+        f"Totale notifiche: {total_notifications_sent}"
+    )
+
+
+def _format_live_line(m):
+    """Riga di /live per una partita 0-0"""
+    minute = m.get('minute')
+    minute_str = f" {minute}'" if minute is not None else " N/A'"
+    return f"• {m['home']} - {m['away']} 0-0{minute_str}{PERIOD_LABELS.get(m.get('period'), '')} ({m['league']})"
 
 
 async def cmd_live(update, context):
     """Mostra partite live 0-0"""
     try:
-        # Esegui uno scraping veloce
-        matches = scrape_sofascore()
+        # Esegui uno scraping veloce (in un thread, per non bloccare gli altri comandi)
+        matches = await asyncio.to_thread(scrape_sofascore)
         
         if not matches:
             await update.message.reply_text("Nessuna partita live al momento.")
             return
         
         # Filtra solo partite 0-0
-        zero_zero = [m for m in matches if m["score_home"] == 0 and m["score_away"] == 0]
+        zero_zero = [m for m in matches if m["is_zero_zero"]]
         
         if not zero_zero:
             await update.message.reply_text(f"Trovate {len(matches)} partite live, nessuna in 0-0.")
             return
         
-        lines = [f"📊 Partite live 0-0: {len(zero_zero)}"]
-        for m in zero_zero[:20]:  # Limita a 20 per non superare limiti Telegram
-            minute_str = f" {m['minute']}'" if m.get('minute') is not None else " N/A'"
-            period_str = f" (1H)" if m.get('period') == 1 else f" (2H)" if m.get('period') == 2 else ""
-            lines.append(f"• {m['home']} - {m['away']} 0-0{minute_str}{period_str} ({m['league']})")
+        # Limita a LIVE_LIST_LIMIT righe per non superare limiti Telegram
+        body = "\n".join(_format_live_line(m) for m in zero_zero[:LIVE_LIST_LIMIT])
+        more = ""
+        if len(zero_zero) > LIVE_LIST_LIMIT:
+            more = f"\n... e altre {len(zero_zero) - LIVE_LIST_LIMIT} partite"
         
-        if len(zero_zero) > 20:
-            lines.append(f"... e altre {len(zero_zero) - 20} partite")
-        
-        await update.message.reply_text("\n".join(lines)[:4000])
+        await update.message.reply_text(f"📊 Partite live 0-0: {len(zero_zero)}\n{body}{more}"[:4000])
     except Exception as e:
         await update.message.reply_text(f"Errore nel recupero partite: {e}")
 
 
 async def cmd_stats(update, context):
     """Mostra statistiche notifiche"""
-    today = datetime.now().date()
-    lines = ["📊 Statistiche notifiche (ultimi 7 giorni):"]
+    today_epoch = int(time.time()) // 86400
+    today = datetime.utcfromtimestamp(today_epoch * 86400).date()
+    
+    # (giorno, conteggio) per gli ultimi 7 giorni, dal più recente
+    counts = [
+        (today - timedelta(days=i), daily_notifications.get(_day_str(today_epoch - i), 0))
+        for i in range(7)
+    ]
+    total_week = sum(count for _, count in counts)
+    body = "\n".join(f"• {d.strftime('%a %d/%m')}: {count}" for d, count in counts)
     
-    total_week = 0
-    for i in range(7):
-        d = today - timedelta(days=i)
-        date_str = d.strftime("%Y-%m-%d")
-        count = daily_notifications.get(date_str, 0)
-        total_week += count
-        day_name = d.strftime("%a %d/%m")
-        lines.append(f"• {day_name}: {count}")
+    await update.message.reply_text(
+        f"📊 Statistiche notifiche (ultimi 7 giorni):\n{body}\n"
+        f"\nTotale settimana: {total_week}\n"
+        f"Totale generale: {total_notifications_sent}"
+    )
+
+
+class ConflictFilter(logging.Filter):
+    """Filtra errori Conflict dal logging di python-telegram-bot"""
+    def filter(self, record):
+        msg = str(record.getMessage())
+        return "conflict" not in msg.lower()
+
+
+_filters_installed = False
+
+
+def _install_log_filters():
+    """Configura logging e filtri Conflict una sola volta (idempotente)"""
+    global _filters_installed
+    if _filters_installed:
+        return
     
-    lines.append(f"\nTotale settimana: {total_week}")
-    lines.append(f"Totale generale: {total_notifications_sent}")
+    # Configura logging per sopprimere errori Conflict
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.WARNING
+    )
     
-    await update.message.reply_text("\n".join(lines))
+    # Applica filtro ai logger di telegram
+    conflict_filter = ConflictFilter()
+    logging.getLogger('telegram').addFilter(conflict_filter)
+    logging.getLogger('httpx').addFilter(conflict_filter)
+    _filters_installed = True
 
 
 def setup_telegram_commands():
-    """Configura e avvia Application per comandi Telegram"""
+    """Configura Application per comandi Telegram (il polling viene avviato da run_bot)"""
     try:
         # Crea Application
-        application = Application.builder().token(TELEGRAM_TOKEN).build()
-        
-        # Configura logging per sopprimere errori Conflict
-        logging.basicConfig(
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            level=logging.WARNING
+        # concurrent_updates: i comandi (/status, /live, ...) non si bloccano a vicenda
+        application = (
+            Application.builder()
+            .token(TELEGRAM_TOKEN)
+            .concurrent_updates(True)
+            .get_updates_connect_timeout(TELEGRAM_GET_UPDATES_CONNECT_TIMEOUT)
+            .get_updates_read_timeout(TELEGRAM_GET_UPDATES_READ_TIMEOUT)
+            .build()
         )
         
-        # Filtra errori Conflict dal logging di python-telegram-bot
-        class ConflictFilter(logging.Filter):
-            def filter(self, record):
-                msg = str(record.getMessage())
-                return "Conflict" not in msg and "conflict" not in msg.lower()
-        
-        # Applica filtro ai logger di telegram
-        telegram_logger = logging.getLogger('telegram')
-        telegram_logger.addFilter(ConflictFilter())
-        httpx_logger = logging.getLogger('httpx')
-        httpx_logger.addFilter(ConflictFilter())
-        
         # Gestione errori
         async def error_handler(update, context: ContextTypes.DEFAULT_TYPE):
             """Gestisce errori durante l'elaborazione degli update"""
@@ -674,8 +938,9 @@ def setup_telegram_commands():
                 # Ignora silenziosamente errori di rete temporanei
                 return
             else:
-                # Log altri errori
-                print(f"⚠️ Errore durante elaborazione update: {error}")
+                # Log altri errori (una sola volta per finestra di ERROR_LOG_DEDUP_SECONDS)
+                if _should_log_error(error):
+                    print(f"⚠️ Errore durante elaborazione update: {error}")
         
         application.add_error_handler(error_handler)
         
@@ -687,51 +952,38 @@ def setup_telegram_commands():
         application.add_handler(CommandHandler("live", cmd_live))
         application.add_handler(CommandHandler("stats", cmd_stats))
         
-        # Avvia polling in thread separato
-        def run_polling():
-            try:
-                application.run_polling(drop_pending_updates=True)
-                print("✅ Application Telegram avviato - Comandi disponibili")
-            except Conflict:
-                print("⚠️ Errore Conflict all'avvio (probabilmente più istanze in esecuzione)")
-                print("⚠️ Il bot continuerà a funzionare ma potrebbe non ricevere comandi")
-            except Exception as e:
-                print(f"⚠️ Errore all'avvio polling: {e}")
-        
-        polling_thread = Thread(target=run_polling, daemon=True)
-        polling_thread.start()
-        
         return application
     except Exception as e:
         print(f"⚠️ Errore nell'avvio Application: {e}")
         return None
 
 
+# Risposte di health check precalcolate (header + body) scritte con una sola write
+_HEALTH_HEADERS = b"HTTP/1.0 200 OK\r\nContent-Type: text/plain\r\nContent-Length: 2\r\nConnection: close\r\n\r\n"
+_HEALTH_GET_RESPONSE = _HEALTH_HEADERS + b"OK"
+_HEALTH_HEAD_RESPONSE = _HEALTH_HEADERS
+_HEALTH_PATHS = frozenset({"/", "/health"})
+
+
 class HealthCheckHandler(BaseHTTPRequestHandler):
     """Handler per HTTP server di keep-alive"""
-    def _send_health_response(self):
-        """Invia risposta di health check"""
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
-        self.send_header('Content-Length', '2')
-        self.end_headers()
-        self.wfile.write(b'OK')
+    def _send_health_response(self, response):
+        """Invia risposta di health check precalcolata"""
+        self.wfile.write(response)
+        self.close_connection = True
     
     def do_GET(self):
         """Gestisce richieste GET"""
-        if self.path == '/health' or self.path == '/':
-            self._send_health_response()
+        if self.path in _HEALTH_PATHS:
+            self._send_health_response(_HEALTH_GET_RESPONSE)
         else:
             self.send_response(404)
             self.end_headers()
     
     def do_HEAD(self):
         """Gestisce richieste HEAD (usate da Render e UptimeRobot)"""
-        if self.path == '/health' or self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.send_header('Content-Length', '2')
-            self.end_headers()
+        if self.path in _HEALTH_PATHS:
+            self._send_health_response(_HEALTH_HEAD_RESPONSE)
         else:
             self.send_response(404)
             self.end_headers()
@@ -750,52 +1002,104 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
 def start_http_server(port=8080):
     """Avvia HTTP server per keep-alive (evita che Render si addormenti)"""
     try:
-        server = HTTPServer(('0.0.0.0', port), HealthCheckHandler)
+        # ThreadingHTTPServer: probe concorrenti (Render, UptimeRobot) non si accodano
+        server = ThreadingHTTPServer(('0.0.0.0', port), HealthCheckHandler)
+        server.daemon_threads = True
         Thread(target=server.serve_forever, daemon=True).start()
         print(f"✅ HTTP server avviato su porta {port} (keep-alive)")
     except Exception as e:
         print(f"⚠️ Errore avvio HTTP server: {e}")
 
 
-def main():
-    """Loop principale: controlla partite ogni POLL_INTERVAL secondi"""
-    global last_check_started_at, last_check_finished_at, last_check_error
-    
-    print("Bot avviato. Monitoraggio partite live su SofaScore...")
+async def start_telegram_polling(application):
+    """Avvia Application e polling degli update Telegram sul loop corrente"""
+    try:
+        await application.initialize()
+        await application.start()
+        await application.updater.start_polling(drop_pending_updates=True)
+        print("✅ Application Telegram avviato - Comandi disponibili")
+    except Conflict:
+        print("⚠️ Errore Conflict all'avvio (probabilmente più istanze in esecuzione)")
+        print("⚠️ Il bot continuerà a funzionare ma potrebbe non ricevere comandi")
+    except Exception as e:
+        print(f"⚠️ Errore all'avvio polling: {e}")
     sys.stdout.flush()
-    
-    # Avvia HTTP server per keep-alive (se PORT è definito, usa quello)
-    port = int(os.getenv('PORT', 8080))
-    start_http_server(port)
-    
-    # Avvia Application per comandi Telegram in background
-    application = setup_telegram_commands()
-    
-    # Attendi un po' per permettere all'application di inizializzarsi
-    time.sleep(2)
+
+
+async def stop_telegram_polling(application):
+    """Ferma polling e Application Telegram"""
+    try:
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+    except Exception as e:
+        print(f"⚠️ Errore nello stop Application: {e}")
+        sys.stdout.flush()
+
+
+async def poll_loop(application):
+    """Loop di controllo: un ciclo ogni POLL_INTERVAL secondi (± POLL_JITTER), mai sovrapposti"""
+    global last_check_started_at, last_check_finished_at, last_check_error
+    loop = asyncio.get_running_loop()
     
     while True:
+        cycle_started = loop.time()
         try:
             last_check_started_at = datetime.now()
-            cycle_start_utc = datetime.utcnow().isoformat() + "Z"
+            cycle_start_utc = _now_utc()
             print(f"[{cycle_start_utc}] ▶️ Inizio ciclo controllo partite")
             sys.stdout.flush()
             last_check_error = None
             if application:
-                process_matches(application)
+                await process_matches_async(application)
             else:
                 print("⚠️ Application non disponibile, salto controllo")
             last_check_finished_at = datetime.now()
-            cycle_end_utc = datetime.utcnow().isoformat() + "Z"
+            cycle_end_utc = _now_utc()
             print(f"[{cycle_end_utc}] ⏹️ Fine ciclo controllo partite")
             sys.stdout.flush()
         except Exception as e:
             last_check_error = str(e)
             print(f"Errore: {e}")
             sys.stdout.flush()
-        print(f"Attesa {POLL_INTERVAL} secondi prima del prossimo controllo...")
+        # Sottrai la durata del ciclo: se il ciclo ha sforato l'intervallo si riparte subito
+        elapsed = loop.time() - cycle_started
+        delay = max(0.0, POLL_INTERVAL + random.uniform(-POLL_JITTER, POLL_JITTER) - elapsed)
+        print(f"Attesa {delay:.0f} secondi prima del prossimo controllo...")
         sys.stdout.flush()
-        time.sleep(POLL_INTERVAL)
+        await asyncio.sleep(delay)
+
+
+async def run_bot(application):
+    """Esegue comandi Telegram e loop di controllo sullo stesso event loop"""
+    if application:
+        await start_telegram_polling(application)
+    try:
+        await poll_loop(application)
+    finally:
+        if application:
+            await stop_telegram_polling(application)
+
+
+def main():
+    """Avvio: HTTP server keep-alive, poi comandi Telegram e controllo partite ogni POLL_INTERVAL secondi"""
+    print("Bot avviato. Monitoraggio partite live su SofaScore...")
+    sys.stdout.flush()
+    
+    # Avvia HTTP server per keep-alive (se PORT è definito, usa quello)
+    port = int(os.getenv('PORT', 8080))
+    start_http_server(port)
+    
+    # Ripristina statistiche notifiche salvate
+    load_stats()
+    
+    # Configura logging (filtri Conflict) e Application per comandi Telegram
+    _install_log_filters()
+    application = setup_telegram_commands()
+    
+    asyncio.run(run_bot(application))
 
 
 if __name__ == "__main__":